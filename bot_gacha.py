@@ -1,10 +1,16 @@
 # -*- coding: utf-8 -*-
 import os
+import re
+import sys
 import time
 import math
 import random
+import bisect
 import asyncio
+import unicodedata
+import types
 import datetime as dt
+import multiprocessing as mp
 
 import discord
 from discord.ext import commands
@@ -21,7 +27,23 @@ INTENTS.message_content = True
 INTENTS.members = True
 INTENTS.presences = False
 
-BOT = commands.Bot(command_prefix="!", intents=INTENTS)
+# ---------- Sharding ----------
+SHARD_COUNT  = int(os.getenv("SHARD_COUNT", "0"))    # 0 = un seul processus, sans sharding
+WORKER_COUNT = int(os.getenv("WORKER_COUNT", "1"))   # processus qui se partagent les shards
+ADVISORY_NS  = 7341                # espace des verrous consultatifs Postgres du bot
+LEADER_LOCK  = -1                  # verrou du leader (sync des commandes, nettoyages)
+INIT_LOCK    = -2                  # sérialise init_db entre workers
+BACKGROUND_EVERY_SEC = 60          # élection du leader, nettoyages, métriques par shard
+LOCK_CHECK_EVERY_SEC = 5           # vérification de la connexion qui porte les verrous
+# keepalives TCP des connexions longues (verrous, LISTEN) : côté client pour détecter la coupure,
+# côté serveur (SET) pour que Postgres ferme vite une session morte et libère ses verrous
+PG_KEEPALIVES = {"keepalives": 1, "keepalives_idle": 30, "keepalives_interval": 10, "keepalives_count": 3}
+
+if SHARD_COUNT:
+    # shard_ids est fixé au démarrage, une fois le slot du worker obtenu (voir MAIN)
+    BOT = commands.AutoShardedBot(command_prefix="!", intents=INTENTS, shard_count=SHARD_COUNT)
+else:
+    BOT = commands.Bot(command_prefix="!", intents=INTENTS)
 
 # ---------- Structure du serveur ----------
 ACCOUNTS_CATEGORY_NAME = "comptes"         # salons privés par joueur
@@ -70,6 +92,16 @@ POOL_R = ["Porteur de sabre", "Villageois", "Démon mineur", "Corbeau kasugai",
 POOL_SR = ["Tanjiro", "Nezuko", "Zenitsu", "Inosuke", "Kanao", "Genya", "Aoi"]
 POOL_SSR = ["Giyu", "Shinobu", "Rengoku", "Tengen", "Mitsuri", "Muichiro", "Obanai", "Sanemi",
             "Akaza", "Doma", "Kokushibo", "Muzan", "Yoriichi"]  # SSR obtenables (inclut Top 5)
+RARITY_RANK = {"R": 1, "SR": 2, "SSR": 3, "UR": 4, "LR": 5}   # ordre d'affichage (LR en premier)
+
+# ---------- Inventaire ----------
+INV_PAGE_SIZE = 15                 # lignes par page de /inventaire
+INV_VIEW_TIMEOUT = 300             # boutons actifs 5 min
+INV_CACHE_USERS = 500              # joueurs gardés en mémoire (pages rendues, index d'autocomplétion)
+INVENTORY_CHANNEL = "inventory_changed"   # NOTIFY Postgres : les autres workers vident leurs caches
+
+# ---------- Admin ----------
+BULK_CHUNK = 1000                  # joueurs par transaction pour /admin_bulk
 
 # =========================
 # ====== DATABASE (PG) ====
@@ -77,11 +109,24 @@ POOL_SSR = ["Giyu", "Shinobu", "Rengoku", "Tengen", "Mitsuri", "Muichiro", "Oban
 
 DB_URL = os.getenv("DATABASE_URL")
 
-def db():
-    return psycopg2.connect(DB_URL, cursor_factory=psycopg2.extras.RealDictCursor)
+SIM_DB = None                      # fabrique de connexions factices, posée par --simulation
+
+def db(**kwargs):
+    if SIM_DB is not None:
+        return SIM_DB()
+    return psycopg2.connect(DB_URL, cursor_factory=psycopg2.extras.RealDictCursor, **kwargs)
+
+def db_session():
+    """Connexion longue en autocommit, avec keepalives des deux côtés."""
+    con = db(**PG_KEEPALIVES); con.autocommit = True
+    con.cursor().execute("SET tcp_keepalives_idle = %s; SET tcp_keepalives_interval = %s; SET tcp_keepalives_count = %s",
+                         (PG_KEEPALIVES["keepalives_idle"], PG_KEEPALIVES["keepalives_interval"],
+                          PG_KEEPALIVES["keepalives_count"]))
+    return con
 
 def init_db():
     con = db(); cur = con.cursor()
+    cur.execute("SELECT pg_advisory_xact_lock(%s, %s)", (ADVISORY_NS, INIT_LOCK))
     cur.execute("""
     CREATE TABLE IF NOT EXISTS users(
         user_id TEXT PRIMARY KEY,
@@ -117,6 +162,14 @@ def init_db():
     );
     """)
     cur.execute("""
+    ALTER TABLE inventory ADD COLUMN IF NOT EXISTS rarity_rank SMALLINT
+        GENERATED ALWAYS AS (CASE rarity WHEN 'R' THEN 1 WHEN 'SR' THEN 2 WHEN 'SSR' THEN 3
+                                         WHEN 'UR' THEN 4 WHEN 'LR' THEN 5 ELSE 0 END) STORED;
+    """)
+    # index des tris de /inventaire, clés toutes croissantes pour le keyset (le tri par nom utilise la clé primaire)
+    cur.execute("CREATE INDEX IF NOT EXISTS inventory_rank_key_idx ON inventory(user_id, (-rarity_rank), (-stars), name)")
+    cur.execute("CREATE INDEX IF NOT EXISTS inventory_stars_key_idx ON inventory(user_id, (-stars), (-rarity_rank), name)")
+    cur.execute("""
     CREATE TABLE IF NOT EXISTS pvp_challenges(
         challenger_id TEXT NOT NULL,
         target_id TEXT NOT NULL,
@@ -124,6 +177,24 @@ def init_db():
         PRIMARY KEY(challenger_id, target_id)
     );
     """)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS admin_grants(
+        grant_id TEXT NOT NULL,
+        user_id TEXT NOT NULL,
+        granted_at BIGINT NOT NULL,
+        PRIMARY KEY(grant_id, user_id)      -- un joueur ne reçoit qu'une fois chaque grant_id
+    );
+    """)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS shard_metrics(
+        shard_id INTEGER PRIMARY KEY,
+        worker INTEGER NOT NULL,
+        guilds INTEGER NOT NULL,
+        latency_ms INTEGER NOT NULL,
+        interactions INTEGER NOT NULL,      -- depuis le rapport précédent
+        updated_at BIGINT NOT NULL
+    );
+    """)
     con.commit(); con.close()
 
 # =========================
@@ -192,17 +263,19 @@ def add_inventory(uid: int, name: str, rarity: str):
     row = cur.fetchone()
     if row:
         cur.execute("UPDATE inventory SET dupes=dupes+1 WHERE user_id=%s AND name=%s", (str(uid), name))
+        invalidate_inventory_cache(cur, uid)
         con.commit(); con.close()
         return False, row["rarity"]
     else:
         cur.execute("INSERT INTO inventory(user_id,name,rarity,stars,dupes) VALUES (%s,%s,%s,%s,%s)",
                     (str(uid), name, rarity, 0, 0))
+        invalidate_inventory_cache(cur, uid)
         con.commit(); con.close()
         return True, rarity
 
 def get_inventory(uid: int):
     con = db(); cur = con.cursor()
-    cur.execute("SELECT * FROM inventory WHERE user_id=%s ORDER BY rarity DESC, stars DESC, name ASC", (str(uid),))
+    cur.execute("SELECT * FROM inventory WHERE user_id=%s ORDER BY rarity_rank DESC, stars DESC, name ASC", (str(uid),))
     rows = cur.fetchall(); con.close()
     return rows
 
@@ -214,9 +287,8 @@ def pity_increment(uid: int, inc: int):
 def pity_reset(uid: int):
     update_user(uid, pity=0)
 
-def roll_one(uid: int) -> dict:
-    """Effectue 1 invocation et renvoie un dict {name, rarity, new, note}"""
-    row = user_get(uid); pity = row["pity"]
+def pick_character(pity: int):
+    """Tire (nom, rareté) selon les taux, SSR forcé à la pitié."""
     force_ssr = pity >= (PITY_SSR - 1)
 
     r = random.random()
@@ -226,8 +298,12 @@ def roll_one(uid: int) -> dict:
         pool = POOL_SR; rarity = "SR"
     else:
         pool = POOL_R; rarity = "R"
+    return random.choice(pool), rarity
 
-    name = random.choice(pool)
+def roll_one(uid: int) -> dict:
+    """Effectue 1 invocation et renvoie un dict {name, rarity, new, note}"""
+    row = user_get(uid)
+    name, rarity = pick_character(row["pity"])
     new, _rar = add_inventory(uid, name, rarity)
 
     if rarity == "SSR":
@@ -248,6 +324,181 @@ def next_star_cost(current_stars: int) -> int:
     nxt = current_stars + 1
     return max(1, nxt) if nxt <= 5 else 0
 
+def promotion_need(name: str, rarity: str, stars: int):
+    """Doublons requis pour la prochaine promotion (None si aucune n'existe)."""
+    if rarity == "R": return 3
+    if rarity == "SR": return 5
+    if rarity == "SSR": return next_star_cost(stars) if stars < 5 else 6
+    if rarity == "UR" and name in TOP5_LR: return 1
+    return None
+
+def is_promotable(row) -> bool:
+    need = promotion_need(row["name"], row["rarity"], row["stars"])
+    return need is not None and row["dupes"] >= need
+
+# =========================
+# ====== AUTOCOMPLETE =====
+# =========================
+
+AUTOCOMPLETE_LIMIT = 25            # maximum de choix accepté par Discord
+
+PROMO_INDEX = {}                   # user_id -> index des persos promouvables (vidé à chaque écriture d'inventaire)
+
+def cache_put(cache: dict, key: str, value):
+    """Borne les caches par joueur à INV_CACHE_USERS entrées (la plus ancienne part)."""
+    if key not in cache and len(cache) >= INV_CACHE_USERS:
+        cache.pop(next(iter(cache)))
+    cache[key] = value
+
+def fold_name(name: str) -> str:
+    """Minuscules sans accents : "Démon mineur" -> "demon mineur"."""
+    s = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    return " ".join(s.lower().split())
+
+def build_prefix_index(names) -> list:
+    """Tableau trié de (clé, nom). Une clé par début de mot : "min" trouve "Démon mineur"."""
+    index = []
+    for name in names:
+        words = fold_name(name).split(" ")
+        for i in range(len(words)):
+            index.append((" ".join(words[i:]), name))
+    index.sort()
+    return index
+
+def prefix_search(index: list, query: str, limit: int = AUTOCOMPLETE_LIMIT) -> list:
+    q = fold_name(query)
+    i = bisect.bisect_left(index, (q,))
+    out, seen = [], set()
+    while i < len(index) and len(out) < limit:
+        key, name = index[i]
+        if not key.startswith(q): break
+        if name not in seen:
+            seen.add(name); out.append(name)
+        i += 1
+    out.sort(key=lambda n: not fold_name(n).startswith(q))   # début du nom d'abord
+    return out
+
+def drop_inventory_cache(uid):
+    PROMO_INDEX.pop(str(uid), None)
+    INV_PAGES.pop(str(uid), None)
+
+def invalidate_inventory_cache(cur, *uids):
+    """À appeler dans la transaction d'écriture : le NOTIFY part au commit vers tous les workers."""
+    cur.execute(f"SELECT pg_notify('{INVENTORY_CHANNEL}', u) FROM unnest(%s::text[]) AS u",
+                ([str(u) for u in uids],))
+    for uid in uids:
+        drop_inventory_cache(uid)
+
+def promotable_index(uid: int) -> list:
+    idx = PROMO_INDEX.get(str(uid))
+    if idx is None:
+        idx = build_prefix_index(r["name"] for r in get_inventory(uid) if is_promotable(r))
+        cache_put(PROMO_INDEX, str(uid), idx)
+    return idx
+
+CATALOG_INDEX = build_prefix_index(dict.fromkeys(POOL_R + POOL_SR + POOL_SSR))
+
+# =========================
+# ====== INVENTAIRE =======
+# =========================
+
+INV_SORTS = {                      # clés croissantes (décroissant = négation), chacune couverte par un index
+    "rarete":  ("-rarity_rank", "-stars", "name"),
+    "etoiles": ("-stars", "-rarity_rank", "name"),
+    "nom":     ("name",),
+}
+
+INV_PAGES = {}                     # user_id -> {(filtres, tri, curseur): page rendue}
+
+def inventory_line(row) -> str:
+    extra = ""
+    if row["rarity"] == "SSR":
+        extra = f" — ⭐{row['stars']} (doublons: {row['dupes']})"
+    elif row["rarity"] in ("UR", "LR"):
+        extra = f" — (doublons: {row['dupes']})"
+    return f"• **{row['name']}** [{row['rarity']}] {extra}"
+
+def inventory_page(uid: int, rarity, min_stars: int, sort: str, after=None) -> dict:
+    """Une page de l'inventaire : {"text", "next"} où next est le curseur de la page suivante (ou None)."""
+    key = (rarity, min_stars, sort, after)
+    pages = INV_PAGES.get(str(uid))
+    if pages is not None and key in pages:
+        return pages[key]
+
+    keys = INV_SORTS[sort]
+    where, params = ["user_id=%s"], [str(uid)]
+    # filtres écrits sur les mêmes expressions que l'index pour en rester des bornes
+    if rarity:
+        where.append("-rarity_rank=%s"); params.append(-RARITY_RANK[rarity])
+    if min_stars:
+        where.append("-stars<=%s"); params.append(-min_stars)
+    if after is not None:
+        # comparaison de lignes : une seule borne de parcours sur l'index
+        where.append(f"({', '.join(keys)}) > ({', '.join(['%s'] * len(keys))})"); params += list(after)
+    select = ", ".join(f"{k} AS k{i}" for i, k in enumerate(keys))
+    con = db(); cur = con.cursor()
+    cur.execute(f"SELECT name,rarity,stars,dupes,{select} FROM inventory WHERE {' AND '.join(where)} "
+                f"ORDER BY {', '.join(keys)} LIMIT %s", params + [INV_PAGE_SIZE + 1])
+    rows = cur.fetchall(); con.close()
+
+    more = len(rows) > INV_PAGE_SIZE
+    rows = rows[:INV_PAGE_SIZE]
+    page = {"text": "\n".join(inventory_line(r) for r in rows),
+            "next": tuple(rows[-1][f"k{i}"] for i in range(len(keys))) if more else None}
+    if pages is None:
+        pages = {}
+        cache_put(INV_PAGES, str(uid), pages)
+    pages[key] = page
+    return page
+
+class InventoryView(discord.ui.View):
+    """Boutons ◀ / ▶ de /inventaire. Garde la pile des curseurs pour revenir en arrière."""
+
+    def __init__(self, uid: int, rarity, min_stars: int, sort: str):
+        super().__init__(timeout=INV_VIEW_TIMEOUT)
+        self.uid = uid
+        self.query = (rarity, min_stars, sort)
+        self.cursors = [None]      # curseur de début de chaque page visitée
+        self.message = None
+        self.load()
+
+    def load(self):
+        self.page = inventory_page(self.uid, *self.query, after=self.cursors[-1])
+        self.prev_btn.disabled = len(self.cursors) == 1
+        self.next_btn.disabled = self.page["next"] is None
+
+    def render(self) -> str:
+        return f"{self.page['text']}\n\n*Page {len(self.cursors)}*"
+
+    async def interaction_check(self, inter: discord.Interaction) -> bool:
+        if inter.user.id != self.uid:
+            await inter.response.send_message("Ce n'est pas ton inventaire.", ephemeral=True)
+            return False
+        return True
+
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        try:
+            await self.message.edit(view=self)
+        except: pass
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def prev_btn(self, inter: discord.Interaction, button: discord.ui.Button):
+        if len(self.cursors) == 1:     # double clic arrivé avant la désactivation du bouton
+            return await inter.response.defer()
+        self.cursors.pop()
+        self.load()
+        await inter.response.edit_message(content=self.render(), view=self)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_btn(self, inter: discord.Interaction, button: discord.ui.Button):
+        if self.page["next"] is None:  # idem sur la dernière page
+            return await inter.response.defer()
+        self.cursors.append(self.page["next"])
+        self.load()
+        await inter.response.edit_message(content=self.render(), view=self)
+
 # =========================
 # ====== SERVER SETUP =====
 # =========================
@@ -438,27 +689,26 @@ async def multi(inter: discord.Interaction):
     lines = [f"• **{r['name']}** ({r['rarity']}) — {r['note']}" for r in results]
     await inter.followup.send("\n".join(lines))
 
-@BOT.tree.command(name="inventaire", description="Liste tes personnages.")
+@BOT.tree.command(name="inventaire", description="Liste tes personnages (par pages).")
+@app_commands.describe(rarete="Filtrer par rareté", etoiles_min="Étoiles minimum", tri="Ordre d'affichage")
+@app_commands.choices(
+    rarete=[app_commands.Choice(name=r, value=r) for r in RARITY_RANK],
+    tri=[app_commands.Choice(name="rareté", value="rarete"),
+         app_commands.Choice(name="étoiles", value="etoiles"),
+         app_commands.Choice(name="nom", value="nom")],
+)
 @only_in_own_channel()
-async def inventaire(inter: discord.Interaction):
+async def inventaire(inter: discord.Interaction, rarete: str = None,
+                     etoiles_min: app_commands.Range[int, 0, 5] = 0, tri: str = "rarete"):
     await inter.response.defer(ephemeral=False)
-    inv = get_inventory(inter.user.id)
-    if not inv:
-        return await inter.followup.send("Inventaire vide.")
-    chunks = []
-    for row in inv:
-        extra = ""
-        if row["rarity"] == "SSR":
-            extra = f" — ⭐{row['stars']} (doublons: {row['dupes']})"
-        elif row["rarity"] in ("UR", "LR"):
-            extra = f" — (doublons: {row['dupes']})"
-        chunks.append(f"• **{row['name']}** [{row['rarity']}] {extra}")
-    text = "\n".join(chunks)
-    for i in range(0, len(text), 1800):
-        await inter.followup.send(text[i:i+1800])
+    view = InventoryView(inter.user.id, rarete, etoiles_min, tri)
+    if not view.page["text"]:
+        msg = "Aucun personnage ne correspond à ces filtres." if (rarete or etoiles_min) else "Inventaire vide."
+        return await inter.followup.send(msg)
+    view.message = await inter.followup.send(view.render(), view=view)
 
 @BOT.tree.command(name="promouvoir", description="Promouvoir R->SR (3 dupes), SR->SSR (5 dupes) ou SSR⭐/UR/LR via doublons.")
-@app_commands.describe(nom="Nom exact du personnage")
+@app_commands.describe(nom="Nom du personnage (autocomplétion)")
 @only_in_own_channel()
 async def promouvoir(inter: discord.Interaction, nom: str):
     await inter.response.defer(ephemeral=False)
@@ -468,49 +718,45 @@ async def promouvoir(inter: discord.Interaction, nom: str):
     if not row:
         con.close(); return await inter.followup.send("Perso introuvable.", ephemeral=True)
     name, rarity, stars, dup = row["name"], row["rarity"], row["stars"], row["dupes"]
+    need = promotion_need(name, rarity, stars)
 
     if rarity == "R":
-        need = 3
         if dup < need:
             con.close(); return await inter.followup.send(f"Il faut {need} doublons pour **R->SR**.")
         cur.execute("UPDATE inventory SET rarity='SR', dupes=dupes-%s WHERE user_id=%s AND name=%s", (need, str(inter.user.id), name))
-        con.commit(); con.close()
+        invalidate_inventory_cache(cur, inter.user.id); con.commit(); con.close()
         return await inter.followup.send(f"⬆️ **{name}** est promu **SR** !")
 
     if rarity == "SR":
-        need = 5
         if dup < need:
             con.close(); return await inter.followup.send(f"Il faut {need} doublons pour **SR->SSR**.")
         cur.execute("UPDATE inventory SET rarity='SSR', dupes=dupes-%s WHERE user_id=%s AND name=%s", (need, str(inter.user.id), name))
-        con.commit(); con.close()
+        invalidate_inventory_cache(cur, inter.user.id); con.commit(); con.close()
         return await inter.followup.send(f"⬆️ **{name}** est promu **SSR** !")
 
     if rarity == "SSR":
         if stars < 5:
-            need = next_star_cost(stars)
             if dup < need:
                 con.close(); return await inter.followup.send(f"Il faut {need} doublon(s) pour passer ⭐{stars+1}.")
             cur.execute("UPDATE inventory SET stars=stars+1, dupes=dupes-%s WHERE user_id=%s AND name=%s",
                         (need, str(inter.user.id), name))
-            con.commit(); con.close()
+            invalidate_inventory_cache(cur, inter.user.id); con.commit(); con.close()
             return await inter.followup.send(f"⭐ **{name}** passe à **{stars+1}** étoile(s) !")
         else:
-            need = 6
             if dup < need:
                 con.close(); return await inter.followup.send(f"Il faut {need} doublons pour **SSR⭐5 -> UR**.")
             cur.execute("UPDATE inventory SET rarity='UR', dupes=dupes-%s WHERE user_id=%s AND name=%s",
                         (need, str(inter.user.id), name))
-            con.commit(); con.close()
+            invalidate_inventory_cache(cur, inter.user.id); con.commit(); con.close()
             return await inter.followup.send(f"🌟 **{name}** devient **UR** !")
 
     if rarity == "UR":
         if name in TOP5_LR:
-            need = 1
             if dup < need:
                 con.close(); return await inter.followup.send(f"Il faut {need} doublon **UR** pour éveiller **{name}** en **LR**.")
             cur.execute("UPDATE inventory SET rarity='LR', dupes=dupes-%s WHERE user_id=%s AND name=%s",
                         (need, str(inter.user.id), name))
-            con.commit(); con.close()
+            invalidate_inventory_cache(cur, inter.user.id); con.commit(); con.close()
             return await inter.followup.send(f"💠 **{name}** éveillé **LR** !")
         else:
             con.close(); return await inter.followup.send("Seuls Muzan, Kokushibo, Akaza, Doma, Yoriichi peuvent passer **LR**.")
@@ -518,6 +764,11 @@ async def promouvoir(inter: discord.Interaction, nom: str):
     con.close()
     await inter.followup.send("Cette promotion n'est pas applicable.")
 
+@promouvoir.autocomplete("nom")
+async def promouvoir_nom_autocomplete(inter: discord.Interaction, current: str):
+    names = prefix_search(promotable_index(inter.user.id), current)
+    return [app_commands.Choice(name=n, value=n) for n in names]
+
 @BOT.tree.command(name="histoire", description=f"Progresse dans l'histoire (−{STAGE_COST} énergie).")
 @only_in_own_channel()
 async def histoire(inter: discord.Interaction):
@@ -696,30 +947,529 @@ async def admin_perso(inter: discord.Interaction, joueur: discord.Member, nom: s
     new, r = add_inventory(joueur.id, nom, rarete)
     await inter.followup.send(f"{'Nouveau' if new else 'Doublon'} **{nom}** [{rarete}] pour {joueur.mention}.")
 
+@admin_perso.autocomplete("nom")
+async def admin_perso_nom_autocomplete(inter: discord.Interaction, current: str):
+    return [app_commands.Choice(name=n, value=n) for n in prefix_search(CATALOG_INDEX, current)]
+
+def bulk_filter(role_ids, chapitre_min, elo_min, elo_max):
+    """(clause WHERE, params) sur `users u` ; aucun critère = tous les joueurs."""
+    where, params = ["TRUE"], []
+    if role_ids is not None:
+        where.append("u.user_id = ANY(%s)"); params.append(role_ids)
+    if chapitre_min is not None:
+        where.append("u.chapter >= %s"); params.append(chapitre_min)
+    if elo_min is not None:
+        where.append("u.elo >= %s"); params.append(elo_min)
+    if elo_max is not None:
+        where.append("u.elo <= %s"); params.append(elo_max)
+    return " AND ".join(where), params
+
+def bulk_count(grant_id: str, where: str, params: list) -> dict:
+    con = db(); cur = con.cursor()
+    cur.execute(f"""
+        SELECT count(*) AS total, count(g.user_id) AS deja
+        FROM users u LEFT JOIN admin_grants g ON g.grant_id=%s AND g.user_id=u.user_id
+        WHERE {where}
+    """, [grant_id] + params)
+    row = cur.fetchone(); con.close()
+    return row
+
+def bulk_grant_chunk(grant_id: str, where: str, params: list, after: str,
+                     gems: int, gold: int, nom, rarete) -> dict:
+    """Traite les BULK_CHUNK joueurs suivants (par user_id) en une transaction.
+    Renvoie {"last": dernier user_id parcouru ou None, "granted": [user_id servis]}."""
+    inv = ""
+    inv_params = []
+    if nom:
+        inv = """, inv AS (
+            INSERT INTO inventory(user_id,name,rarity,stars,dupes)
+            SELECT user_id, %s, %s, 0, 0 FROM fresh
+            ON CONFLICT (user_id, name) DO UPDATE SET dupes=inventory.dupes+1
+        )"""
+        inv_params = [nom, rarete]
+    con = db(); cur = con.cursor()
+    cur.execute(f"""
+        WITH batch AS (
+            SELECT u.user_id FROM users u WHERE {where} AND u.user_id > %s ORDER BY u.user_id LIMIT %s
+        ), fresh AS (
+            INSERT INTO admin_grants(grant_id, user_id, granted_at)
+            SELECT %s, user_id, %s FROM batch
+            ON CONFLICT DO NOTHING RETURNING user_id
+        ), res AS (
+            UPDATE users u SET gems=u.gems+%s, gold=u.gold+%s FROM fresh WHERE u.user_id=fresh.user_id
+        ){inv}
+        SELECT (SELECT max(user_id) FROM batch) AS last, ARRAY(SELECT user_id FROM fresh) AS granted
+    """, params + [after, BULK_CHUNK, grant_id, now(), gems, gold] + inv_params)
+    row = cur.fetchone()
+    if nom and row["granted"]:
+        invalidate_inventory_cache(cur, *row["granted"])
+    con.commit(); con.close()
+    return row
+
+@BOT.tree.command(name="admin_bulk", description="(Admin) Récompense de masse : rôle, tous les joueurs ou filtre.")
+@is_admin()
+@app_commands.rename(or_="or")
+@app_commands.describe(grant_id="Identifiant unique (relancer = ne sert que les oubliés)",
+                       gemmes="Gemmes à ajouter", or_="Or à ajouter",
+                       nom="Perso à donner (optionnel)", rarete="R/SR/SSR/UR/LR (si perso)",
+                       role="Limiter aux membres de ce rôle", chapitre_min="Chapitre minimum",
+                       elo_min="ELO minimum", elo_max="ELO maximum",
+                       simulation="Compter les joueurs concernés sans rien donner")
+async def admin_bulk(inter: discord.Interaction, grant_id: str, gemmes: int = 0, or_: int = 0,
+                     nom: str = None, rarete: str = None, role: discord.Role = None,
+                     chapitre_min: int = None, elo_min: int = None, elo_max: int = None,
+                     simulation: bool = False):
+    await inter.response.defer(ephemeral=True)
+    if nom:
+        rarete = (rarete or "").upper()
+        if rarete not in ("R","SR","SSR","UR","LR"):
+            return await inter.followup.send("Rareté invalide.")
+    if not (gemmes or or_ or nom):
+        return await inter.followup.send("Rien à donner : précise des gemmes, de l'or ou un perso.")
+
+    role_ids = [str(m.id) for m in role.members] if role else None
+    where, params = bulk_filter(role_ids, chapitre_min, elo_min, elo_max)
+    counts = bulk_count(grant_id, where, params)
+    todo = counts["total"] - counts["deja"]
+    if simulation:
+        return await inter.followup.send(
+            f"Simulation `{grant_id}` : **{counts['total']}** joueur(s) ciblé(s), "
+            f"{counts['deja']} déjà servi(s), **{todo}** à servir.")
+
+    msg = await inter.followup.send(f"Distribution `{grant_id}` : 0/{todo}…")
+    done, after = 0, ""
+    while True:
+        res = bulk_grant_chunk(grant_id, where, params, after, gemmes, or_, nom, rarete)
+        if res["last"] is None:
+            break
+        after = res["last"]
+        done += len(res["granted"])
+        await msg.edit(content=f"Distribution `{grant_id}` : {done}/{todo}…")
+
+    gifts = [f"{gemmes}💎" if gemmes else "", f"{or_}🪙" if or_ else "", f"**{nom}** [{rarete}]" if nom else ""]
+    await msg.edit(content=f"✅ `{grant_id}` : {' + '.join(g for g in gifts if g)} donnés à **{done}** joueur(s).")
+
+@admin_bulk.autocomplete("nom")
+async def admin_bulk_nom_autocomplete(inter: discord.Interaction, current: str):
+    return [app_commands.Choice(name=n, value=n) for n in prefix_search(CATALOG_INDEX, current)]
+
+@BOT.tree.command(name="shards", description="(Admin) État des shards et des workers.")
+@is_admin()
+async def shards_cmd(inter: discord.Interaction):
+    await inter.response.defer(ephemeral=True)
+    con = db(); cur = con.cursor()
+    cur.execute("SELECT * FROM shard_metrics ORDER BY shard_id")
+    rows = cur.fetchall(); con.close()
+    if not rows: return await inter.followup.send("Aucune métrique pour l'instant.")
+    lines = [f"Shard {r['shard_id']} (worker {r['worker']}) — {r['guilds']} serveurs, {r['latency_ms']} ms, "
+             f"{r['interactions']} interactions/{BACKGROUND_EVERY_SEC}s — il y a {now()-r['updated_at']}s"
+             for r in rows]
+    await inter.followup.send("\n".join(lines))
+
+# =========================
+# ====== SHARDING =========
+# =========================
+
+WORKER_SLOT = 0                    # slot obtenu par ce processus (0 sans sharding)
+LOCK_CON = None                    # connexion qui porte les verrous consultatifs de session
+LOCK_PID = None                    # pg_backend_pid() de LOCK_CON
+SLOT_PID = None                    # session Postgres qui détenait notre slot en dernier
+SLOT_LOST = False                  # slot pris par un autre worker : sortie non nulle (voir MAIN)
+LISTEN_CON = None                  # connexion en LISTEN sur INVENTORY_CHANNEL
+LISTEN_FD = None
+IS_LEADER = False
+BACKGROUND_TASK = None
+SHARD_INTERACTIONS = {}            # shard_id -> interactions depuis le dernier rapport
+
+def shard_range(slot: int, workers: int, shards: int) -> list:
+    """Shards contigus du worker `slot` : 10 shards / 3 workers -> 0-3, 4-6, 7-9."""
+    base, extra = divmod(shards, workers)
+    start = slot*base + min(slot, extra)
+    return list(range(start, start + base + (1 if slot < extra else 0)))
+
+def owned_shards() -> list:
+    return list(BOT.shard_ids) if SHARD_COUNT else [0]
+
+def try_advisory_lock(key: int) -> bool:
+    """Verrou de session : libéré par Postgres si le processus meurt, un autre worker le reprend."""
+    global LOCK_CON, LOCK_PID
+    if LOCK_CON is None:
+        LOCK_CON = db_session()
+        cur = LOCK_CON.cursor()
+        cur.execute("SELECT pg_backend_pid() AS pid")
+        LOCK_PID = cur.fetchone()["pid"]
+    cur = LOCK_CON.cursor()
+    cur.execute("SELECT pg_try_advisory_lock(%s, %s) AS ok", (ADVISORY_NS, key))
+    return cur.fetchone()["ok"]
+
+def advisory_lock_holder(key: int):
+    """pid de la session qui détient le verrou `key` (None s'il est libre)."""
+    cur = LOCK_CON.cursor()
+    cur.execute("""
+        SELECT pid FROM pg_locks
+        WHERE locktype='advisory' AND granted AND classid=%s AND objid=%s AND objsubid=2
+    """, (ADVISORY_NS, key))
+    row = cur.fetchone()
+    return row["pid"] if row else None
+
+def con_alive(con) -> bool:
+    if con is None or con.closed:
+        return False
+    try:
+        con.cursor().execute("SELECT 1")
+        return True
+    except psycopg2.Error:
+        return False
+
+def drain_inventory_notifies():
+    try:
+        LISTEN_CON.poll()
+    except psycopg2.Error:
+        return                     # connexion perdue : ensure_inventory_listener la recrée
+    while LISTEN_CON.notifies:
+        drop_inventory_cache(LISTEN_CON.notifies.pop(0).payload)
+
+def ensure_inventory_listener():
+    """Écoute les écritures d'inventaire des autres workers. Après une coupure, les notifications
+    manquées sont perdues : on vide alors tous les caches."""
+    global LISTEN_CON, LISTEN_FD
+    if con_alive(LISTEN_CON):
+        drain_inventory_notifies()
+        return
+    loop = asyncio.get_running_loop()
+    if LISTEN_FD is not None:
+        loop.remove_reader(LISTEN_FD)
+        LISTEN_FD = None
+    if LISTEN_CON is not None:
+        try:
+            LISTEN_CON.close()
+        except Exception:
+            pass
+        LISTEN_CON = None
+    con = db_session()
+    con.cursor().execute(f"LISTEN {INVENTORY_CHANNEL}")
+    LISTEN_CON, LISTEN_FD = con, con.fileno()
+    loop.add_reader(LISTEN_FD, drain_inventory_notifies)
+    PROMO_INDEX.clear(); INV_PAGES.clear()
+
+async def keep_locks() -> bool:
+    """Si la connexion des verrous est tombée, on se reconnecte et on reprend le slot. Tant que notre
+    ancienne session (pas encore vue morte par Postgres) le détient, on la termine et on réessaie ;
+    les shards restent servis puisque personne d'autre ne peut le prendre. Renvoie False (et ferme
+    le bot) seulement si une autre session, donc un autre worker, détient le slot."""
+    global LOCK_CON, IS_LEADER, SLOT_PID, SLOT_LOST
+    if con_alive(LOCK_CON):
+        return True
+    if IS_LEADER:
+        print(f"Worker {WORKER_SLOT} perd la leadership (connexion des verrous coupée).")
+    IS_LEADER = False
+    if LOCK_CON is not None:
+        try:
+            LOCK_CON.close()
+        except Exception:
+            pass
+        LOCK_CON = None
+    if not SHARD_COUNT:
+        return True
+    while not try_advisory_lock(WORKER_SLOT):
+        holder = advisory_lock_holder(WORKER_SLOT)
+        if holder is not None and holder != SLOT_PID:
+            print(f"Slot {WORKER_SLOT} repris par un autre worker, arrêt de ce processus.")
+            SLOT_LOST = True
+            await BOT.close()
+            return False
+        if holder is None:
+            continue               # libéré entre les deux requêtes
+        print(f"Slot {WORKER_SLOT} encore tenu par notre ancienne session {holder}, on la termine.")
+        try:
+            LOCK_CON.cursor().execute("SELECT pg_terminate_backend(%s)", (holder,))
+            continue
+        except psycopg2.Error:
+            pass                   # droits insuffisants : les keepalives finiront par la fermer
+        await asyncio.sleep(LOCK_CHECK_EVERY_SEC)
+    SLOT_PID = LOCK_PID
+    return True
+
+async def leader_tick():
+    global IS_LEADER
+    if not IS_LEADER and try_advisory_lock(LEADER_LOCK):
+        IS_LEADER = True
+        print(f"Worker {WORKER_SLOT} devient leader.")
+        try:
+            await BOT.tree.sync()
+        except Exception:
+            pass
+    if IS_LEADER:
+        sweep_challenges()
+
+def claim_worker_slot() -> int:
+    """Attend un slot libre parmi WORKER_COUNT ; les workers en trop restent en réserve."""
+    global SLOT_PID
+    while True:
+        for slot in range(WORKER_COUNT):
+            if try_advisory_lock(slot):
+                SLOT_PID = LOCK_PID
+                return slot
+        print("Tous les slots de worker sont pris, nouvel essai dans 30 s.")
+        time.sleep(30)
+
+def sweep_challenges():
+    con = db(); cur = con.cursor()
+    cur.execute("DELETE FROM pvp_challenges WHERE created_at < %s", (now() - CHALLENGE_TTL_SEC,))
+    con.commit(); con.close()
+
+def report_shard_metrics():
+    latencies = dict(BOT.latencies) if SHARD_COUNT else {0: BOT.latency}
+    t = now()
+    con = db(); cur = con.cursor()
+    for sid in owned_shards():
+        lat = latencies.get(sid, float("nan"))
+        guilds = sum(1 for g in BOT.guilds if g.shard_id == sid)
+        cur.execute("""
+            INSERT INTO shard_metrics(shard_id, worker, guilds, latency_ms, interactions, updated_at)
+            VALUES (%s,%s,%s,%s,%s,%s)
+            ON CONFLICT (shard_id) DO UPDATE SET worker=EXCLUDED.worker, guilds=EXCLUDED.guilds,
+                latency_ms=EXCLUDED.latency_ms, interactions=EXCLUDED.interactions, updated_at=EXCLUDED.updated_at
+        """, (sid, WORKER_SLOT, guilds, int(lat*1000) if math.isfinite(lat) else -1,
+              SHARD_INTERACTIONS.pop(sid, 0), t))
+    con.commit(); con.close()
+
+async def background_loop():
+    """Surveille les verrous toutes les LOCK_CHECK_EVERY_SEC ; toutes les BACKGROUND_EVERY_SEC,
+    un seul leader fait les nettoyages et chaque worker publie les métriques de ses shards."""
+    next_run = 0
+    while not BOT.is_closed():
+        try:
+            if not await keep_locks():
+                return
+        except Exception as e:
+            print(f"Reconnexion des verrous en échec : {e}")
+        try:
+            ensure_inventory_listener()
+        except Exception as e:
+            print(f"Écoute des inventaires en échec : {e}")
+        if time.monotonic() >= next_run:
+            next_run = time.monotonic() + BACKGROUND_EVERY_SEC
+            try:
+                await leader_tick()
+            except Exception as e:
+                print(f"Tâche du leader en échec : {e}")
+            try:
+                report_shard_metrics()
+            except Exception as e:
+                print(f"Métriques des shards en échec : {e}")
+        await asyncio.sleep(LOCK_CHECK_EVERY_SEC)
+
 # =========================
 # ====== BOT LIFECYCLE ====
 # =========================
 
+@BOT.event
+async def on_interaction(inter: discord.Interaction):
+    sid = inter.guild.shard_id if inter.guild else 0
+    SHARD_INTERACTIONS[sid] = SHARD_INTERACTIONS.get(sid, 0) + 1
+
 @BOT.event
 async def on_ready():
+    global BACKGROUND_TASK
     init_db()
-    try:
-        await BOT.tree.sync()
-    except Exception:
-        pass
     for g in BOT.guilds:
         try:
             await ensure_guild_setup(g)
         except Exception:
             pass
-    print(f"Connecté comme {BOT.user} (ID: {BOT.user.id})")
+    if BACKGROUND_TASK is None:
+        BACKGROUND_TASK = asyncio.create_task(background_loop())
+    print(f"Connecté comme {BOT.user} (ID: {BOT.user.id}) — worker {WORKER_SLOT}, shards {owned_shards()}")
+
+# =========================
+# ====== SIMULATION =======
+# =========================
+# python3 bot_gacha.py --simulation [shards] [évènements par shard] [latence DB en ms]
+# Pour 1..shards workers : chaque processus prend son slot (claim_worker_slot) et élit un leader
+# via des verrous consultatifs factices partagés, puis rejoue /tirage et l'autocomplétion de
+# /promouvoir (vrais handlers, vraie logique d'inventaire) reçus de ses shards par une gateway
+# factice, avec une latence Postgres simulée. À mi-parcours la connexion des verrous du leader
+# est coupée sans que Postgres le voie, pour exercer la reprise du slot (keep_locks) et la
+# passation de leadership.
+
+SIM_DB_LATENCY = 0.001             # s par requête factice
+SIM_PLAYERS_PER_SHARD = 200
+SIM_TICK_EVENTS = 50               # évènements entre deux passages keep_locks / leader_tick
+SIM_LOCKS = None                   # verrous consultatifs factices (dict partagé entre processus)
+SIM_LOCKS_MUTEX = None
+SIM_USERS = {}                     # tables factices, propres à chaque worker
+SIM_INV = {}
+
+def sim_release_locks(owner: int):
+    with SIM_LOCKS_MUTEX:
+        for key, held_by in list(SIM_LOCKS.items()):
+            if held_by == owner:
+                del SIM_LOCKS[key]
+
+class SimConnection:
+    """Connexion Postgres factice : latence fixe, tables en mémoire, verrous de session
+    partagés entre workers et libérés à la fermeture comme par Postgres."""
+
+    def __init__(self):
+        self.closed = 0
+        self.autocommit = False
+        self.owner = random.getrandbits(31)     # tient lieu de pg_backend_pid()
+        self.rows = []
+
+    def cursor(self):
+        return self
+
+    def commit(self):
+        pass
+
+    def close(self):
+        if not self.closed:        # une connexion déjà coupée ne prévient plus le serveur
+            sim_release_locks(self.owner)
+        self.closed = 1
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+    def execute(self, sql: str, params=()):
+        if self.closed:
+            raise psycopg2.InterfaceError("connection already closed")
+        time.sleep(SIM_DB_LATENCY)
+        q = " ".join(sql.split()); p = [str(v) if isinstance(v, int) else v for v in params]
+        self.rows = []
+        if q.startswith("SELECT pg_try_advisory_lock"):
+            key = f"{p[0]}:{p[1]}"
+            with SIM_LOCKS_MUTEX:
+                owner = SIM_LOCKS.setdefault(key, self.owner)
+            self.rows = [{"ok": owner == self.owner}]
+        elif q.startswith("SELECT pg_backend_pid()"):
+            self.rows = [{"pid": self.owner}]
+        elif q.startswith("SELECT pid FROM pg_locks"):
+            owner = SIM_LOCKS.get(f"{p[0]}:{p[1]}")
+            self.rows = [{"pid": owner}] if owner is not None else []
+        elif q.startswith("SELECT pg_terminate_backend"):
+            sim_release_locks(params[0])
+        elif q.startswith("SELECT * FROM users WHERE user_id=%s"):
+            row = SIM_USERS.get(p[0])
+            self.rows = [dict(row)] if row else []
+        elif q.startswith("UPDATE users SET"):
+            keys = re.findall(r"(\w+)=%s", q.split(" WHERE ")[0])
+            SIM_USERS[p[-1]].update(zip(keys, params))
+        elif q.startswith("SELECT * FROM inventory WHERE user_id=%s AND name=%s"):
+            row = SIM_INV.get(p[0], {}).get(p[1])
+            self.rows = [dict(row)] if row else []
+        elif q.startswith("SELECT * FROM inventory WHERE user_id=%s"):
+            self.rows = [dict(r) for r in SIM_INV.get(p[0], {}).values()]
+        elif q.startswith("UPDATE inventory SET dupes=dupes+1"):
+            SIM_INV[p[0]][p[1]]["dupes"] += 1
+        elif q.startswith("INSERT INTO inventory"):
+            uid, name, rarity, stars, dupes = params
+            SIM_INV.setdefault(uid, {})[name] = {"user_id": uid, "name": name, "rarity": rarity,
+                                                 "stars": stars, "dupes": dupes}
+        # pg_notify, SELECT 1, nettoyages : latence seulement
+
+class SimInteraction:
+    """Interaction factice : seulement ce que lisent les handlers rejoués."""
+
+    def __init__(self, shard_id: int, uid: int):
+        self.guild = types.SimpleNamespace(id=shard_id, shard_id=shard_id)
+        self.user = types.SimpleNamespace(id=uid, name=f"joueur{uid}", display_name=f"joueur{uid}")
+        self.response = self.followup = self
+
+    async def defer(self, **kwargs):
+        pass
+
+    async def send(self, *args, **kwargs):
+        pass
+
+async def stub_shard(shard_id: int, events: int, queue: asyncio.Queue):
+    """Gateway factice d'un shard : 70 % de /tirage, 30 % d'autocomplétions de /promouvoir."""
+    for i in range(events):
+        uid = shard_id * 100000 + i % SIM_PLAYERS_PER_SHARD
+        kind = "autocomplete" if i % 10 < 3 else "tirage"
+        await queue.put((kind, SimInteraction(shard_id, uid)))
+
+async def sim_run(owned: list, events_per_shard: int) -> list:
+    """Consomme les évènements des shards du worker ; renvoie les changements de leadership."""
+    queue = asyncio.Queue(maxsize=100)
+    producers = [asyncio.create_task(stub_shard(sid, events_per_shard, queue)) for sid in owned]
+    total = len(owned) * events_per_shard
+    leadership, was_leader = [], False
+    for i in range(total):
+        if i % SIM_TICK_EVENTS == 0:
+            await keep_locks()
+            await leader_tick()
+            if IS_LEADER != was_leader:
+                leadership.append((time.monotonic(), WORKER_SLOT, IS_LEADER))
+                was_leader = IS_LEADER
+        if IS_LEADER and i == total // 2:
+            LOCK_CON.closed = 1    # coupure réseau : la session reste ouverte côté Postgres avec ses verrous
+        kind, inter = await queue.get()
+        await on_interaction(inter)
+        if kind == "tirage":
+            await tirage.callback(inter)
+        else:
+            await promouvoir_nom_autocomplete(inter, "")
+    await asyncio.gather(*producers)
+    return leadership
+
+def sim_worker(workers: int, shards: int, events_per_shard: int, latency: float, locks, mutex, start, out):
+    global SIM_DB, SIM_DB_LATENCY, SIM_LOCKS, SIM_LOCKS_MUTEX, SHARD_COUNT, WORKER_COUNT, WORKER_SLOT
+    SIM_DB, SIM_DB_LATENCY, SIM_LOCKS, SIM_LOCKS_MUTEX = SimConnection, latency, locks, mutex
+    SHARD_COUNT, WORKER_COUNT = shards, workers
+    WORKER_SLOT = claim_worker_slot()
+    owned = shard_range(WORKER_SLOT, workers, shards)
+    for sid in owned:
+        for i in range(SIM_PLAYERS_PER_SHARD):
+            uid = str(sid * 100000 + i)
+            SIM_USERS[uid] = {"user_id": uid, "gems": 10**9, "pity": 0, "daily_pulls": 0, "weekly_pulls": 0}
+    start.wait()
+    t0 = time.perf_counter()
+    leadership = asyncio.run(sim_run(owned, events_per_shard))
+    elapsed = time.perf_counter() - t0
+    LOCK_CON.close()
+    out.put((WORKER_SLOT, sum(SHARD_INTERACTIONS.values()), elapsed, leadership))
+
+def run_simulation(shards: int = 4, events_per_shard: int = 500, latency_ms: int = 1):
+    print(f"Simulation : {shards} shards × {events_per_shard} évènements, {latency_ms} ms par requête")
+    print("workers | évènements | secondes | évts/s | leadership")
+    manager = mp.Manager()
+    locks, mutex = manager.dict(), manager.Lock()
+    for workers in range(1, shards + 1):
+        locks.clear()
+        out, start = mp.Queue(), mp.Barrier(workers)
+        procs = [mp.Process(target=sim_worker, args=(workers, shards, events_per_shard, latency_ms / 1000,
+                                                     locks, mutex, start, out))
+                 for _ in range(workers)]
+        for pr in procs: pr.start()
+        results = [out.get() for _ in procs]
+        for pr in procs: pr.join()
+        total = sum(r[1] for r in results)
+        wall = max(r[2] for r in results)          # le worker le plus lent borne le débit
+        changes = sorted(c for r in results for c in r[3])
+        leaders = " → ".join(f"w{slot}" for _, slot, gained in changes if gained)
+        print(f"{workers:7d} | {total:10d} | {wall:8.2f} | {total/wall:6.0f} | {leaders}")
 
 # =========================
 # ====== MAIN =============
 # =========================
 
 if __name__ == "__main__":
+    if "--simulation" in sys.argv:
+        args = [int(a) for a in sys.argv[sys.argv.index("--simulation")+1:]]
+        run_simulation(*args)
+        sys.exit(0)
     TOKEN = os.getenv("DISCORD_TOKEN")
     if not TOKEN or not DB_URL:
         raise RuntimeError("DISCORD_TOKEN ou DATABASE_URL manquant. Ajoute-les dans Railway > Variables.")
+    if SHARD_COUNT:
+        if not 1 <= WORKER_COUNT <= SHARD_COUNT:
+            raise RuntimeError("WORKER_COUNT doit être compris entre 1 et SHARD_COUNT.")
+        WORKER_SLOT = claim_worker_slot()
+        BOT.shard_ids = shard_range(WORKER_SLOT, WORKER_COUNT, SHARD_COUNT)
     BOT.run(TOKEN)
+    if SLOT_LOST:
+        sys.exit(1)                # la plateforme relance le processus, qui attend un slot libre